@@ -8,6 +8,10 @@
 
     imdb2vsmeta is the answer!
 """
+import base64
+import hashlib
+import json
+import mmap
 import os
 import re
 import shutil
@@ -22,7 +26,8 @@ from imdbmovies import IMDB
 
 from vsmetaCodec.vsmetaEncoder import VsMetaMovieEncoder, VsMetaSeriesEncoder
 from vsmetaCodec.vsmetaDecoder import VsMetaDecoder
-from vsmetaCodec.vsmetaInfo import VsMetaImageInfo
+from vsmetaCodec.vsmetaInfo import VsMetaImageInfo, VsMetaInfo
+from vsmetaCodec.vsmetaCode import VsMetaCode
 
 
 class MutuallyExclusiveOption(click.Option):
@@ -51,21 +56,438 @@ class MutuallyExclusiveOption(click.Option):
         )
 
 
-def write_vsmeta_file(filename: str, content: bytes):
+class VsMetaSink:
+    """ Stands in for VsMetaCode._data: appended bytes go to write_file.
+
+    With write_file None bytes are only counted, for size-only passes.
+    """
+
+    def __init__(self, write_file=None):
+        self.write_file = write_file
+        self.written = 0
+
+    def __iadd__(self, chunk: bytes):
+        if self.write_file is not None:
+            self.write_file.write(chunk)
+        self.written += len(chunk)
+        return self
+
+    def __len__(self) -> int:
+        return self.written
+
+
+class StreamVsMetaCode(VsMetaCode):
+    """ VsMetaCode writing its content to a VsMetaSink instead of memory.
+    """
+
+    # Multiple of 57 bytes: base64 lines of 76 characters are not split.
+    B64_CHUNK = 57 * 1024
+
+    def __new__(cls, *args, **kwargs):
+        # Keep the bytes base empty, content goes to the sink.
+        return super().__new__(cls)
+
+    def __init__(self, sink: VsMetaSink):
+        super().__init__()
+        self._data = sink
+
+    def writeImage(self, tag: bytes, image: bytes, last_char_nl: bool = False):
+        """ Writes tag and image as VsMetaBase.b64encodeImage() encodes it,
+            base64 encoded in chunks of the image buffer.
+        """
+        image = memoryview(image)
+        size = len(image)
+        # base64 length plus one '\n' per 76 characters line, the last one
+        # only if last_char_nl.
+        length = 4 * -(-size // 3) + -(-size // 57)
+        if size > 0 and not last_char_nl:
+            length -= 1
+
+        self._data += tag
+        self._data += self.specialInt(length)
+        if self._data.write_file is None:
+            self._data.written += length
+            return
+
+        for pos in range(0, size, self.B64_CHUNK):
+            chunk = base64.encodebytes(image[pos:pos + self.B64_CHUNK])
+            if pos + self.B64_CHUNK >= size and not last_char_nl:
+                chunk = chunk[:-1]
+            self._data += chunk
+
+    def writeGroup(self, tag: bytes, write_payload):
+        """ Writes tag, payload length and payload. Empty payloads are skipped.
+
+        write_payload(code) is called twice: first on a size-only code to
+        get the length written ahead of the payload, then on this one.
+        """
+        size_code = StreamVsMetaCode(VsMetaSink())
+        write_payload(size_code)
+        if len(size_code) == 0:
+            return
+
+        self._data += tag
+        self._data += self.specialInt(len(size_code))
+        write_payload(self)
+
+
+class VsMetaStreamMixin:
+    """ Adds writeVsMetaStream() to the VsMeta encoders.
+
+    Same sections as VsMetaBase._writeEncodedContent(), written to a file
+    handle as they are encoded. Groups and images are never held in memory.
+    """
+
+    def writeVsMetaStream(self, info, write_file):
+        """ Encodes info into write_file. Same output as encode(info).
+        """
+        self.info = info
+        self.encContent = StreamVsMetaCode(VsMetaSink(write_file))
+        try:
+            self._writeFileHeader()
+            self._writeShowTitle()
+            self._writeEpisodeTitle()
+            self._writeEpisodeDate()
+            self._writeEpisodeLocked()
+            self._writeSummary()
+            self._writeEpisodeMetaJSON()
+
+            self.encContent.writeGroup(self.TAG_GROUP1, self._writeGroup1Payload)
+
+            self._writeClassification()
+            self._writeRating()
+            self._streamPoster()
+
+            self._streamGroup2()
+            self._streamGroup3()
+        finally:
+            self.encContent = VsMetaCode()
+
+    def _streamPoster(self):
+        for index, episode_img in enumerate(self.info.episodeImageInfo):
+            self.encContent.writeTag(self.TAG_EPISODE_THUMB_DATA)
+            self.encContent.writeImage(int(index + 1).to_bytes(1, 'big'),
+                                       episode_img.image,
+                                       episode_img.b64LastCharIsNewLine)
+            self.encContent.writeTag(self.TAG_EPISODE_THUMB_MD5)
+            self.encContent.writeTag(int(index + 1).to_bytes(1, 'big'),
+                                     episode_img.md5str)
+
+    def _writeGroup1Payload(self, code: StreamVsMetaCode):
+        for cast in self.info.list.cast:
+            code.writeTag(self.TAG1_CAST, cast)
+        for director in self.info.list.director:
+            code.writeTag(self.TAG1_DIRECTOR, director)
+        for genre in self.info.list.genre:
+            code.writeTag(self.TAG1_GENRE, genre)
+        for writer in self.info.list.writer:
+            code.writeTag(self.TAG1_WRITER, writer)
+
+    def _streamGroup2(self):
+        # group 2 - occurence no. \x01
+        self.encContent.writeGroup(self.TAG_GROUP2 + b'\x01',
+                                   self._writeGroup2Payload)
+
+    def _writeGroup2Payload(self, code: StreamVsMetaCode):
+        tv_show_year = self.year_of_date(self.info.tvshowReleaseDate)
+        code.writeTag(self.TAG2_SEASON, self.info.season)
+        code.writeTag(self.TAG2_EPISODE, self.info.episode)
+        code.writeTag(self.TAG2_TV_SHOW_YEAR, tv_show_year)
+
+        if tv_show_year != 0:
+            code.writeTag(self.TAG2_RELEASE_DATE_TV_SHOW,
+                          self.info.tvshowReleaseDate)
+        if self.info.tvshowLocked:
+            code.writeTag(self.TAG2_LOCKED, True)
+        if len(self.info.tvshowSummary) > 0:
+            code.writeTag(self.TAG2_TVSHOW_SUMMARY, self.info.tvshowSummary)
+
+        img_info = self.info.posterImageInfo
+        image_bytes = None if img_info is None else img_info.image
+        if image_bytes is not None and len(image_bytes) > 0:
+            code.writeImage(self.TAG2_POSTER_DATA, image_bytes)
+            code.writeTag(self.TAG2_POSTER_MD5, img_info.md5str)
+
+        if self.info.tvshowMetaJson is not None and \
+           len(self.info.tvshowMetaJson) > 0:
+            code.writeTag(self.TAG2_TVSHOW_META_JSON, self.info.tvshowMetaJson)
+
+        code.writeGroup(self.TAG2_GROUP3, self._writeGroup3Payload)
+
+    def _streamGroup3(self):
+        self.encContent.writeGroup(self.TAG_GROUP3 + b'\x01',
+                                   self._writeGroup3Payload)
+
+    def _writeGroup3Payload(self, code: StreamVsMetaCode):
+        img_info = self.info.backdropImageInfo
+        if img_info.image is not None and len(img_info.image) > 0 \
+           and self.info.timestamp > int(datetime(1900, 1, 1, 0, 0).timestamp()):
+            code.writeImage(self.TAG3_BACKDROP_DATA, img_info.image,
+                            img_info.b64LastCharIsNewLine)
+            code.writeTag(self.TAG3_BACKDROP_MD5, img_info.md5str)
+            code.writeTag(self.TAG3_TIMESTAMP, int(self.info.timestamp))
+
+
+class VsMetaMovieStreamEncoder(VsMetaStreamMixin, VsMetaMovieEncoder):
+    """ VsMetaMovieEncoder with writeVsMetaStream() """
+
+    def _streamGroup2(self):
+        return  # Movies have no Group2, as VsMetaMovieEncoder._writeGroup2()
+
+
+class VsMetaSeriesStreamEncoder(VsMetaStreamMixin, VsMetaSeriesEncoder):
+    """ VsMetaSeriesEncoder with writeVsMetaStream() """
+
+    def _streamGroup2(self):
+        self.rewriteSeasonEpisode()
+        super()._streamGroup2()
+
+    def _streamGroup3(self):
+        return  # Series write Group3 within Group2
+
+
+class MappedVsMetaImage:
+    """ Base64 encoded image left in place within a mapped .vsmeta file.
+
+    Only decoded, in chunks, when hashed or written out.
+    """
+
+    # Raw base64 bytes read per chunk: 1024 lines of 76 characters + '\n'.
+    B64_CHUNK = 77 * 1024
+
+    def __init__(self, mapped, start: int, end: int):
+        self._mapped = mapped
+        self._start = start
+        self._end = end
+
+    def chunks(self):
+        """ Yields the decoded image in chunks. """
+        rest = b''
+        for pos in range(self._start, self._end, self.B64_CHUNK):
+            data = rest + self._mapped[pos:min(pos + self.B64_CHUNK, self._end)]
+            data = data.translate(None, b' \t\r\n')
+            cut = len(data) - len(data) % 4
+            rest = data[cut:]
+            if cut > 0:
+                yield base64.decodebytes(data[:cut])
+        if rest:
+            yield base64.decodebytes(rest)
+
+    def md5str(self) -> str:
+        """ md5 hexdigest of the decoded image, as VsMetaImageInfo.md5str """
+        md5 = hashlib.md5()
+        for chunk in self.chunks():
+            md5.update(chunk)
+        return md5.hexdigest()
+
+    def writeToFile(self, filename: str):
+        """ Writes the decoded image to filename. """
+        with open(filename, 'wb') as write_file:
+            for chunk in self.chunks():
+                write_file.write(chunk)
+
+
+class MappedVsMetaCode(VsMetaCode):
+    """ VsMetaCode reading from a window over a mmap (or bytes) object.
+
+    VsMetaCode is a bytes subclass: VsMetaCode(data) copies the whole file
+    and readVsData() copies each group once more. This class only keeps
+    offsets into the mapping; fields are copied out as they are read.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        # Keep the bytes base empty, content stays in the mapping.
+        return super().__new__(cls)
+
+    def __init__(self, mapped, start: int = 0, end: int = None):
+        super().__init__(mapped)
+        self._start = start
+        self._pos = start
+        self._end = len(mapped) if end is None else end
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def data(self) -> bytes:
+        return self._data[self._start:self._end]
+
+    def _readRange(self, num_bytes: int) -> tuple[int, int]:
+        start = self._pos
+        if start + num_bytes > self._end:
+            error = "Data at POS {0:d} runs {1:d} bytes past its section... Abort!"\
+                    .format(start, start + num_bytes - self._end)
+            raise Exception(error)
+        self._pos += num_bytes
+        return start, self._pos
+
+    def _readData(self, num_bytes: int) -> bytes:
+        start, end = self._readRange(num_bytes)
+        return self._data[start:end]
+
+    def dataAhead(self, byte_cnt: int) -> bytes:
+        return self._data[self._pos:min(self._pos + byte_cnt, self._end)]
+
+    def byteCountAhead(self) -> int:
+        return self._end - self._pos
+
+    def readHeader(self) -> bytes:
+        # Short files are reported as not a vsmeta file, as by VsMetaCode.
+        return self._readData(min(2, self.byteCountAhead()))
+
+    def readVsData(self) -> 'MappedVsMetaCode':
+        start, end = self._readRange(self.readSpecialInt())
+        return MappedVsMetaCode(self._data, start, end)
+
+    def readMappedImage(self) -> MappedVsMetaImage:
+        start, end = self._readRange(self.readSpecialInt())
+        return MappedVsMetaImage(self._data, start, end)
+
+
+class VsMetaMappedDecoder(VsMetaDecoder):
+    """ VsMetaDecoder reading from a mapped .vsmeta file.
+
+    Images are not decoded into info: they are kept as MappedVsMetaImage in
+    episodeImages, posterImage and backdropImage, and their md5 checked in
+    chunks. The mapping must stay open while these are used.
+    """
+
+    def decode(self, encoded_data=None) -> int:
+        self.info = VsMetaInfo()
+        self.info.episodeLocked = False
+        self.episodeImages = []
+        self.posterImage = None
+        self.backdropImage = None
+        return self._readVsMetaEncoded(MappedVsMetaCode(encoded_data))
+
+    def _readVsMetaEncoded(self, code: MappedVsMetaCode) -> int:
+        tag = code.readHeader()
+        if tag != self.TAG_FILE_HEADER_MOVIE and\
+                tag != self.TAG_FILE_HEADER_SERIES:
+            error = "This is not a vsmeta movie or series file"
+            raise Exception(error)
+
+        episode_img = None
+        while code.byteCountAhead() > 0:
+            tag = code.readTag()
+            if tag == self.TAG_SHOW_TITLE:
+                self.info.showTitle = code.readString()
+            elif tag == self.TAG_SHOW_TITLE2:
+                self.info.showTitle2 = code.readString()
+            elif tag == self.TAG_EPISODE_TITLE:
+                self.info.episodeTitle = code.readString()
+            elif tag == self.TAG_YEAR:
+                self.info.year = code.readSpecialInt()
+            elif tag == self.TAG_EPISODE_RELEASE_DATE:
+                self.info.episodeReleaseDate = code.readString()
+            elif tag == self.TAG_EPISODE_LOCKED:
+                self.info.episodeLocked = code.readBool()
+            elif tag == self.TAG_CHAPTER_SUMMARY:
+                self.info.chapterSummary = code.readString()
+            elif tag == self.TAG_EPISODE_META_JSON:
+                self.info.episodeMetaJson = code.readString()
+                meta_json = json.loads(self.info.episodeMetaJson)
+                if meta_json is not None and "com.synology.TheMovieDb" in meta_json:
+                    self.info.tmdbReference = meta_json["com.synology.TheMovieDb"]["reference"]
+            elif tag == self.TAG_CLASSIFICATION:
+                self.info.classification = code.readString()
+            elif tag == self.TAG_RATING:
+                self.info.rating = code.readFloat()
+            elif tag == self.TAG_GROUP1:
+                self._readGroup1(code.readVsData())
+            elif tag == self.TAG_GROUP2:
+                if code.readInt(1) != 1:    # index value, not used and not stored
+                    raise Exception("Index of Group-2 is not \\x01 !")
+                self._readGroup2(code.readVsData())
+            elif tag == self.TAG_GROUP3:
+                if code.readInt(1) != 1:    # index value, not used and not stored
+                    raise Exception("Index of Group-3 is not \\x01 !")
+                self._readGroup3(code.readVsData())
+            elif tag == self.TAG_EPISODE_THUMB_DATA:
+                if code.readInt(1) != 1:    # index value, not used and not stored
+                    raise Exception("Index of episode_thumb_data is not \\x01 !")
+                episode_img = code.readMappedImage()
+            elif tag == self.TAG_EPISODE_THUMB_MD5:
+                code.readInt(1)             # index value, not used and not stored
+                if episode_img is None or code.readString() != episode_img.md5str():
+                    raise Exception("vsmeta md5-hash for episodeImage doesn't match with image byte-string!")
+                self.episodeImages.append(episode_img)
+            else:
+                code.dumpData(32)
+                error = "Unknown TAG {0:2x} at POS {1:d} detected... Abort!"\
+                        .format(int.from_bytes(tag, "little"), code.pos())
+                raise Exception(error)
+        return code.byteCountAhead()
+
+    def _readGroup2(self, code: MappedVsMetaCode) -> int:
+        self.info.posterImageInfo = VsMetaImageInfo()
+        while code.byteCountAhead() > 0:
+            tag = code.readTag()
+            if tag == self.TAG2_SEASON:
+                self.info.season = code.readInt(1)
+            elif tag == self.TAG2_EPISODE:
+                self.info.episode = code.readInt(1)
+            elif tag == self.TAG2_TV_SHOW_YEAR:
+                self.info.tvShowYear = code.readSpecialInt()
+            elif tag == self.TAG2_RELEASE_DATE_TV_SHOW:
+                self.info.tvshowReleaseDate = code.readString()
+            elif tag == self.TAG2_LOCKED:
+                self.info.locked = code.readBool()
+            elif tag == self.TAG2_TVSHOW_SUMMARY:
+                self.info.tvshowSummary = code.readString()
+            elif tag == self.TAG2_POSTER_DATA:
+                self.posterImage = code.readMappedImage()
+            elif tag == self.TAG2_POSTER_MD5:
+                if self.posterImage is None or code.readString() != self.posterImage.md5str():
+                    raise Exception("vsmeta md5-hash for poster image doesn't match with image byte-string!")
+            elif tag == self.TAG2_TVSHOW_META_JSON:
+                self.info.tvshowMetaJson = code.readString()
+            elif tag == self.TAG2_GROUP3:
+                self._readGroup3(code.readVsData())
+            else:
+                code.dumpData(32)
+                error = "Unknown TAG {0:2x} in TAG_GROUP2 at POS {1:d} detected... Abort!"\
+                        .format(int.from_bytes(tag, "little"), code.pos())
+                raise Exception(error)
+        return code.byteCountAhead()
+
+    def _readGroup3(self, code: MappedVsMetaCode) -> int:
+        self.info.backdropImageInfo = VsMetaImageInfo()
+        while code.byteCountAhead() > 0:
+            tag = code.readTag()
+            if tag == self.TAG3_BACKDROP_DATA:
+                self.backdropImage = code.readMappedImage()
+            elif tag == self.TAG3_BACKDROP_MD5:
+                if self.backdropImage is None or code.readString() != self.backdropImage.md5str():
+                    raise Exception("vsmeta md5-hash for backdrop image doesn't match with image byte-string!")
+            elif tag == self.TAG3_TIMESTAMP:
+                self.info.timestamp = code.readTimeStamp()
+            else:
+                code.dumpData(32)
+                error = "Unknown TAG {0:2x} in TAG_GROUP3 at POS {1:d} detected... Abort!"\
+                        .format(int.from_bytes(tag, "little"), code.pos())
+                raise Exception(error)
+        return code.byteCountAhead()
+
+
+def write_vsmeta_file(filename: str, vsmeta_writer: VsMetaStreamMixin, info):
     """ Writes to file in binary mode. Used to write .vsmeta files.
+
+    Sections are streamed to the file as vsmeta_writer encodes info.
     """
     with open(filename, 'wb') as write_file:
-        write_file.write(content)
-        write_file.close()
+        vsmeta_writer.writeVsMetaStream(info, write_file)
+
 
+def map_vsmeta_file(filename: str) -> mmap.mmap | bytes:
+    """ Maps file read-only into memory. Used to read .vsmeta files.
 
-def read_vsmeta_file(filename: str) -> bytes:
-    """ Reads from file in binary mode. Used to read .vsmeta files.
+    Empty files cannot be mapped and are returned as b''.
+    Caller must close the returned mmap.
     """
     with open(filename, 'rb') as read_file:
-        file_content = read_file.read()
-        read_file.close()
-    return file_content
+        if os.fstat(read_file.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(read_file.fileno(), 0, access=mmap.ACCESS_READ)
 
 
 def lookfor_imdb(movie_title, year=None, tv=False):
@@ -191,7 +613,7 @@ def map_to_vsmeta(imdb_id, imdb_info,
 def map_to_vsmeta_movie(imdb_id, imdb_info, poster_file, vsmeta_filename, verbose):
     """Encodes a .VSMETA Movie file based on imdb_info and poster_file """
 
-    vsmeta_writer = VsMetaMovieEncoder()
+    vsmeta_writer = VsMetaMovieStreamEncoder()
 
     # Build up vsmeta info
     info = vsmeta_writer.info
@@ -293,14 +715,14 @@ def map_to_vsmeta_movie(imdb_id, imdb_info, poster_file, vsmeta_filename, verbos
             f"\tGenre          : {''.join([f'{name}, ' for name in info.list.genre])}")
         click.echo("\t---------------: ---------------")
 
-    write_vsmeta_file(vsmeta_filename, vsmeta_writer.encode(info))
+    write_vsmeta_file(vsmeta_filename, vsmeta_writer, info)
 
 
 def map_to_vsmeta_series(imdb_id, imdb_info, season, episode,
                          poster_file, vsmeta_filename, verbose):
     """Encodes a .VSMETA Series file based on imdb_info and poster_file """
 
-    vsmeta_writer = VsMetaSeriesEncoder()
+    vsmeta_writer = VsMetaSeriesStreamEncoder()
 
     # Build up vsmeta info
     info = vsmeta_writer.info
@@ -418,7 +840,7 @@ def map_to_vsmeta_series(imdb_id, imdb_info, season, episode,
             f"\tGenre          : {''.join([f'{name}, ' for name in info.list.genre])}")
         click.echo("\t---------------: ---------------")
 
-    write_vsmeta_file(vsmeta_filename, vsmeta_writer.encode(info))
+    write_vsmeta_file(vsmeta_filename, vsmeta_writer, info)
 
 
 def copy_file(source, destination, force=False, no_copy=False, verbose=False):
@@ -539,14 +961,27 @@ def check_file(file_path):
     When checking multiple files, these files are overwritten.
     """
 
-    vsmeta_bytes = read_vsmeta_file(file_path)
-    reader = VsMetaDecoder()
-    reader.decode(vsmeta_bytes)
+    prefix = os.path.basename(file_path)
+    vsmeta_map = map_vsmeta_file(file_path)
+    try:
+        reader = VsMetaMappedDecoder()
+        reader.decode(vsmeta_map)
+
+        # Images are not in reader.info: printInfo() writes an empty
+        # backdrop file, replaced here by the image from the mapping.
+        reader.info.printInfo('.', prefix=prefix)
+        if reader.backdropImage is not None:
+            reader.backdropImage.writeToFile(prefix + "_back_drop.jpg")
+        for idx, episode_img in enumerate(reader.episodeImages):
+            episode_img.writeToFile(prefix + f"_poster_{idx + 1:02d}.jpg")
+    finally:
+        if isinstance(vsmeta_map, mmap.mmap):
+            vsmeta_map.close()
 
-    reader.info.printInfo('.', prefix=os.path.basename(file_path))
     click.echo(f"TV Show Season : {reader.info.season:02}")
     click.echo(f"TV Show Episode: {reader.info.episode:02}")
 
+
 @click.command()
 @click.option('--movies', is_flag=True,
               cls=MutuallyExclusiveOption, mutually_exclusive=['series'],
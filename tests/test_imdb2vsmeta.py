@@ -0,0 +1,189 @@
+"""
+    Tests for .vsmeta streaming write and memory-mapped --check read.
+"""
+import io
+import os
+import tracemalloc
+from datetime import date
+
+import pytest
+
+from vsmetaCodec.vsmetaBase import VsMetaBase
+from vsmetaCodec.vsmetaCode import VsMetaCode
+from vsmetaCodec.vsmetaDecoder import VsMetaDecoder
+from vsmetaCodec.vsmetaEncoder import VsMetaMovieEncoder, VsMetaSeriesEncoder
+from vsmetaCodec.vsmetaInfo import VsMetaImageInfo
+
+import imdb2vsmeta
+
+
+POSTER = bytes(range(256)) * 40
+BIG_POSTER = bytes(range(256)) * 16384  # 4 MB
+
+
+def build_info(vsmeta_writer, tv, poster=POSTER):
+    """ Fills vsmeta_writer.info the way map_to_vsmeta_* does. """
+    info = vsmeta_writer.info
+    info.showTitle = "Title"
+    info.showTitle2 = "Title"
+    info.episodeTitle = "Title"
+    info.setEpisodeDate(date(1999, 3, 31))
+    info.season = 1 if tv else 0
+    info.episode = 2 if tv else 0
+    info.tvshowReleaseDate = date(1999, 3, 31) if tv else date(1900, 1, 1)
+    info.episodeLocked = False
+    info.timestamp = 1700000000
+    info.classification = "R"
+    info.rating = 8.7
+    info.chapterSummary = "Summary"
+    info.list.cast = ["Actor A", "Actor B"]
+    info.list.director = ["Director"]
+    info.list.writer = ["Writer"]
+    info.list.genre = [] if tv else ["Action"]
+
+    episode_img = VsMetaImageInfo()
+    episode_img.image = poster
+    if not tv:
+        info.episodeImageInfo.append(episode_img)
+    info.backdropImageInfo.image = poster
+    info.posterImageInfo = episode_img
+    return info
+
+
+def stream_writer(tv):
+    return imdb2vsmeta.VsMetaSeriesStreamEncoder() if tv \
+        else imdb2vsmeta.VsMetaMovieStreamEncoder()
+
+
+def read_file(filename):
+    with open(filename, "rb") as read_file:
+        return read_file.read()
+
+
+@pytest.mark.parametrize("tv, plain_class", [
+    (False, VsMetaMovieEncoder),
+    (True, VsMetaSeriesEncoder),
+])
+def test_write_vsmeta_file_matches_encode(tmp_path, tv, plain_class):
+    plain_writer = plain_class()
+    expected = plain_writer.encode(build_info(plain_writer, tv))
+
+    vsmeta_writer = stream_writer(tv)
+    vsmeta_filename = str(tmp_path / "title.vsmeta")
+    imdb2vsmeta.write_vsmeta_file(vsmeta_filename, vsmeta_writer,
+                                  build_info(vsmeta_writer, tv))
+
+    assert read_file(vsmeta_filename) == expected
+    # Plain encode() still works on a stream encoder.
+    assert stream_writer(tv).encode(build_info(stream_writer(tv), tv)) == expected
+
+
+@pytest.mark.parametrize("size", [0, 1, 57, 114, 1000, 57 * 1024, 57 * 1024 + 1])
+@pytest.mark.parametrize("last_char_nl", [False, True])
+def test_write_image_matches_codec(size, last_char_nl):
+    image = (POSTER * 6)[:size]
+    expected = VsMetaCode()
+    expected.writeTag(b'\x0a', VsMetaBase.b64encodeImage(image, last_char_nl))
+
+    write_file = io.BytesIO()
+    code = imdb2vsmeta.StreamVsMetaCode(imdb2vsmeta.VsMetaSink(write_file))
+    code.writeImage(b'\x0a', image, last_char_nl)
+    size_code = imdb2vsmeta.StreamVsMetaCode(imdb2vsmeta.VsMetaSink())
+    size_code.writeImage(b'\x0a', image, last_char_nl)
+
+    assert write_file.getvalue() == expected.data()
+    assert len(size_code) == len(expected)
+
+
+@pytest.mark.parametrize("tv", [False, True])
+def test_write_vsmeta_file_memory(tmp_path, tv):
+    vsmeta_writer = stream_writer(tv)
+    info = build_info(vsmeta_writer, tv, BIG_POSTER)
+
+    tracemalloc.start()
+    imdb2vsmeta.write_vsmeta_file(str(tmp_path / "title.vsmeta"),
+                                  vsmeta_writer, info)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert peak < len(BIG_POSTER) // 8
+
+
+@pytest.mark.parametrize("tv", [False, True])
+def test_check_file_mapped(tmp_path, monkeypatch, capsys, tv):
+    monkeypatch.chdir(tmp_path)
+    vsmeta_writer = stream_writer(tv)
+    imdb2vsmeta.write_vsmeta_file("title.vsmeta", vsmeta_writer,
+                                  build_info(vsmeta_writer, tv))
+
+    reader = VsMetaDecoder()
+    reader.decode(read_file("title.vsmeta"))
+    reader.info.printInfo('.', prefix="expected")
+    expected = capsys.readouterr().out
+
+    imdb2vsmeta.check_file(str(tmp_path / "title.vsmeta"))
+    output = capsys.readouterr().out
+
+    assert output == expected + (
+        f"TV Show Season : {reader.info.season:02}\n"
+        f"TV Show Episode: {reader.info.episode:02}\n")
+    assert read_file("title.vsmeta_back_drop.jpg") == POSTER
+    if tv:
+        assert not os.path.isfile("title.vsmeta_poster_01.jpg")
+    else:
+        assert read_file("title.vsmeta_poster_01.jpg") == POSTER
+
+
+@pytest.mark.parametrize("tv", [False, True])
+def test_check_file_memory(tmp_path, monkeypatch, capsys, tv):
+    monkeypatch.chdir(tmp_path)
+    vsmeta_writer = stream_writer(tv)
+    imdb2vsmeta.write_vsmeta_file("title.vsmeta", vsmeta_writer,
+                                  build_info(vsmeta_writer, tv, BIG_POSTER))
+
+    tracemalloc.start()
+    imdb2vsmeta.check_file(str(tmp_path / "title.vsmeta"))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    capsys.readouterr()
+
+    assert peak < len(BIG_POSTER) // 8
+    assert read_file("title.vsmeta_back_drop.jpg") == BIG_POSTER
+
+
+def test_check_file_bad_md5(tmp_path):
+    vsmeta_writer = stream_writer(False)
+    vsmeta_filename = str(tmp_path / "title.vsmeta")
+    imdb2vsmeta.write_vsmeta_file(vsmeta_filename, vsmeta_writer,
+                                  build_info(vsmeta_writer, False))
+    content = bytearray(read_file(vsmeta_filename))
+    # Flip one base64 character of the episode image.
+    pos = content.index(b'\x8a\x01') + 5
+    content[pos:pos + 1] = b'A' if content[pos:pos + 1] != b'A' else b'B'
+    with open(vsmeta_filename, "wb") as write_file:
+        write_file.write(content)
+
+    with pytest.raises(Exception, match="md5-hash for episodeImage"):
+        imdb2vsmeta.check_file(vsmeta_filename)
+
+
+@pytest.mark.parametrize("content", [
+    # Cast string of 10 bytes within a Group1 of 6 bytes.
+    b'\x08\x01\x52\x06\x0a\x0aActorActor',
+    # Group1 length past the end of the file.
+    b'\x08\x01\x52\x40\x0a\x05Actor',
+])
+def test_decode_group_overrun(content):
+    with pytest.raises(Exception, match="past its section"):
+        imdb2vsmeta.VsMetaMappedDecoder().decode(content)
+
+
+def test_check_file_empty(tmp_path):
+    vsmeta_filename = tmp_path / "empty.vsmeta"
+    vsmeta_filename.write_bytes(b'')
+
+    assert imdb2vsmeta.map_vsmeta_file(str(vsmeta_filename)) == b''
+    with pytest.raises(Exception, match="not a vsmeta movie or series file"):
+        VsMetaDecoder().decode(b'')
+    with pytest.raises(Exception, match="not a vsmeta movie or series file"):
+        imdb2vsmeta.check_file(str(vsmeta_filename))